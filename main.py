@@ -1,16 +1,32 @@
+from __future__ import annotations
+
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import pandas as pd
 import re
-from datetime import datetime, timedelta, timezone
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from decouple import config
-from typing import Tuple
-import pytz  # <-- Importamos pytz para manejar zonas horarias
+from urllib.parse import urlencode
+from zoneinfo import ZoneInfo
+
+# orjson (C) parsea el JSON de Canvas 2-3x mas rapido que el json de la
+# stdlib; si no esta instalado seguimos con response.json() normal.
+try:
+    import orjson
+    def _parse_json(response):
+        return orjson.loads(response.content)
+except ImportError:
+    def _parse_json(response):
+        return response.json()
 
 st.set_page_config(layout="wide", page_title="Supervision de notas al dia 💯", page_icon="💯")  # Modo ancho
 
-# Ajusta a tu zona horaria
-tz_local = pytz.timezone("America/Santiago")
+# Ajusta a tu zona horaria (zoneinfo es stdlib y mas rapido que pytz)
+tz_local = ZoneInfo("America/Santiago")
 
 # Configuración de Canvas
 BASE_URL = "https://canvas.uautonoma.cl/api/v1"
@@ -20,28 +36,171 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
-def fetch_canvas_api(endpoint, params=None):
-    full_url = f"{BASE_URL}{endpoint}"
-    results = []
-    
-    response = requests.get(full_url, headers=HEADERS, params=params)
+# Sesion compartida: reutiliza las conexiones TLS entre llamadas (keep-alive)
+# y reintenta sola ante 429/5xx con backoff.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Pool compartido para todas las llamadas a Canvas que se pueden hacer en paralelo.
+EXECUTOR = ThreadPoolExecutor(max_workers=16)
+
+# Pool aparte para procesar cursos completos: si compartiera hilos con las
+# descargas individuales, muchos cursos podrian ocupar todos los workers y
+# dejar sin hilos a sus propias llamadas.
+COURSE_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Tamano de pagina pedido a Canvas. Pedimos el maximo posible; si el endpoint
+# lo capea mas abajo, el loop de paginacion (Link: next) sigue funcionando.
+PAGE_SIZE = 1000
+
+# Separador de IDs de curso (comas, espacios o saltos de linea).
+_CID_SPLIT = re.compile(r"[\s,]+")
+
+# Estados de celda que cuentan como "fuera de plazo" / curso con problemas.
+ESTADOS_MALOS = {"no calificado en plazo", "no entrego nada", "nota no coincide", "calificada pero sin nota"}
+
+# Texto y tipo de celda para un alumno sin calificar, segun la fase de la
+# tarea (estado_info) y si entrego o no.
+TEXTO_SIN_CALIFICAR = {
+    "En plazo":      {True: ("Entregado y en plazo", "ontime_ok"),
+                      False: ("No entregado pero en plazo", "ontime_miss")},
+    "Plazo vencido": {True: ("No calificado en plazo", "late_nograde"),
+                      False: ("No entrego nada", "late_nosubmit")},
+}
+
+# Color de fondo por estado del curso en el resumen final.
+_ESTADO_COLOR = {
+    "Inexistente":    "red",
+    "No configurado": "orange",
+    "Hay cosas mal":  "red",
+    "Todo Bien":      "lightgreen",
+}
+
+# CSS por tipo de celda; se aplica de una sola vez con Styler.apply(axis=None)
+# en vez de invocar una funcion Python por celda.
+_STYLE_KIND = {
+    "future":        "background-color: black; color: white",
+    "graded":        "background-color: lightgreen; color: black",
+    "sin_nota":      "background-color: orange; color: black",
+    "no_coincide":   "background-color: orange; color: black",
+    "ontime_ok":     "background-color: lightblue; color: black",
+    "ontime_miss":   "background-color: lightblue; color: black",
+    "late_nograde":  "background-color: yellow; color: black",
+    "late_nosubmit": "background-color: red; color: white",
+}
+
+# Color por estado de la tarea en la tabla de asignaciones; se aplica con un
+# Series.map vectorizado por columna en vez de un callback por celda.
+_ESTADO_ASG_COLOR = {
+    "No iniciado":   "background-color: black; color: white",
+    "En plazo":      "background-color: lightgreen",
+    "Plazo vencido": "background-color: lightcoral",
+}
+
+# Cache de ETags por URL: en corridas repetidas Canvas responde 304 sin
+# cuerpo para lo que no cambio y reutilizamos el JSON ya parseado.
+_etag_cache: dict[str, tuple[str, object, str | None]] = {}
+_etag_lock = threading.Lock()
+
+def _get_json(url, params=None):
+    """
+    GET condicional con If-None-Match. Retorna (data, next_url); data es None
+    si el recurso no existe (404). Ante un 304 se devuelve el cuerpo (y el
+    link de paginacion) cacheados sin volver a decodificar nada.
+    """
+    key = f"{url}?{urlencode(params, doseq=True)}" if params else url
+    with _etag_lock:
+        cached = _etag_cache.get(key)
+
+    headers = {"If-None-Match": cached[0]} if cached else None
+    response = SESSION.get(url, params=params, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[1], cached[2]
     if response.status_code == 404:
-        return None 
+        return None, None
     response.raise_for_status()
 
-    data = response.json()
-    if not isinstance(data, list):
-        return data 
+    data = _parse_json(response)
+    next_url = response.links.get("next", {}).get("url")
+    etag = response.headers.get("ETag")
+    if etag:
+        with _etag_lock:
+            _etag_cache[key] = (etag, data, next_url)
+    return data, next_url
 
-    results.extend(data)
-    while response.links.get("next"):
-        url = response.links["next"]["url"]
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        results.extend(response.json())
+def fetch_canvas_api(endpoint, params=None):
+    data, next_url = _get_json(f"{BASE_URL}{endpoint}", params)
+    if data is None:
+        return None
+    if not isinstance(data, list):
+        return data
 
+    results = list(data)
+    while next_url:
+        page, next_url = _get_json(next_url)
+        results.extend(page)
     return results
 
+def iter_canvas_api(endpoint, params=None):
+    """
+    Itera los elementos de un endpoint paginado pagina por pagina, sin
+    acumular todas las paginas en una lista intermedia: cada pagina se
+    consume apenas se parsea.
+    """
+    data, next_url = _get_json(f"{BASE_URL}{endpoint}", params)
+    if data is None:
+        return
+    yield from data
+
+    while next_url:
+        page, next_url = _get_json(next_url)
+        yield from page
+
+# Metadatos que cambian poco (nombre del curso, sub-cuenta): los cacheamos
+# media hora para que repetir la revision no vuelva a pegarle a Canvas.
+@st.cache_data(ttl=1800, show_spinner=False)
+def get_course(course_id: str):
+    return fetch_canvas_api(f"/courses/{course_id}")
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def get_account(account_id):
+    return fetch_canvas_api(f"/accounts/{account_id}")
+
+# Listas del curso: cache corto, suficiente para que un rerun de Streamlit
+# (o un doble click) no vuelva a descargarlas, sin sacrificar frescura.
+@st.cache_data(ttl=60, show_spinner=False)
+def get_enrollments(course_id: str):
+    # Solo matriculas activas: menos payload y no aparecen alumnos eliminados.
+    return list(iter_canvas_api(
+        f"/courses/{course_id}/enrollments",
+        {"state[]": "active", "per_page": PAGE_SIZE}
+    ))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_assignments(course_id: str):
+    return list(iter_canvas_api(f"/courses/{course_id}/assignments", {"per_page": PAGE_SIZE}))
+
+def submissions_por_tarea(course_id: str) -> dict:
+    """
+    Descarga las submissions del curso con la llamada bulk y las indexa por
+    (tarea, alumno) a medida que llegan las paginas. Sin include[] Canvas
+    manda el objeto minimo (sin comentarios, rubrica ni adjuntos), que ya
+    contiene todo lo que leemos: user_id, workflow_state, submitted_at,
+    graded_at y score.
+    """
+    subs_by_asg = defaultdict(dict)
+    for s in iter_canvas_api(
+        f"/courses/{course_id}/students/submissions",
+        {"student_ids[]": "all", "per_page": PAGE_SIZE, "grouped": False}
+    ):
+        subs_by_asg[s.get("assignment_id")][s.get("user_id")] = s
+    return subs_by_asg
+
 def es_entrega_real(submission: dict) -> bool:
     """
     Retorna True si 'submission' indica que el alumno realmente entregó.
@@ -55,25 +214,22 @@ def es_entrega_real(submission: dict) -> bool:
     submitted_at = submission.get("submitted_at")
     return (w_state == "submitted") or (submitted_at is not None)
 
-def obtener_rol_info(course_id: str, role: str) -> Tuple[str, str]:
-    data = fetch_canvas_api(
-        f"/courses/{course_id}/enrollments",
-        params={"role[]": role, "per_page": 100}
-    )
-    if not data:
-        return "No existe", "No existe"
-    # Extrae nombres y correos
-    names  = [e.get("user",{}).get("name",       "No existe") for e in data]
-    emails = [e.get("user",{}).get("login_id",   "No existe") for e in data]
-    # Une en un solo string
-    return ", ".join(names), ", ".join(emails)
-
-def procesar_curso(course_id: str) -> Tuple[pd.DataFrame, list, dict]:
+# Cache corto sobre el resultado completo: repetir la revision de los mismos
+# IDs dentro de 5 minutos no vuelve a tocar Canvas. El dict retornado solo
+# contiene DataFrames, listas y dicts, asi que st.cache_data lo picklea bien.
+@st.cache_data(ttl=300, show_spinner=False)
+def procesar_curso(course_id: str) -> dict:
     """
-    Retorna:
-      1) DataFrame con 1 columna por tarea (texto con estado/nota).
-      2) Lista de tareas procesadas (las que tienen fecha de entrega).
-      3) Diccionario con info de Profesor, Tutor, Director.
+    Descarga y procesa un curso completo sin tocar la UI, de modo que pueda
+    correr en un hilo del pool mientras otros cursos avanzan.
+
+    Retorna un dict con:
+      - course / account: metadatos del curso y su sub-cuenta (course=None si no existe).
+      - avisos: advertencias acumuladas, para mostrarlas al renderizar.
+      - df_asg: DataFrame con el detalle de las tareas fechadas.
+      - df / df_kind: grilla alumno x tarea (texto y "tipo" de celda).
+      - asignaciones: tareas procesadas (las que tienen fecha de entrega).
+      - info: diccionario con info de Profesor, Tutor, Director.
     
     Lógica en cada celda:
       - "No iniciado"                -> si now_utc < due_date_utc
@@ -89,54 +245,136 @@ def procesar_curso(course_id: str) -> Tuple[pd.DataFrame, list, dict]:
     - Para mostrar (fecha_entrega_str, plazo_calif_str), convertimos a la zona horaria local.
     """
 
-    # 1) Alumnos
-    enrollments = fetch_canvas_api(
-        f"/courses/{course_id}/enrollments",
-        params={"type[]": "StudentEnrollment", "per_page": 100}
-    )
+    res = {
+        "course": None, "account": None, "avisos": [],
+        "df_asg": None, "df": None, "df_kind": None,
+        "asignaciones": [], "info": {},
+    }
+
+    course_info = get_course(course_id)
+    if not course_info:
+        return res
+    res["course"] = course_info
+
+    # Las tres descargas del curso (enrollments, tareas y submissions) no
+    # dependen entre si; las lanzamos juntas al pool.
+    enrollments_future = EXECUTOR.submit(get_enrollments, course_id)
+    assignments_future = EXECUTOR.submit(get_assignments, course_id)
+    # Una sola llamada bulk trae las submissions de todas las tareas del curso,
+    # en vez de una llamada por tarea (el clasico problema N+1).
+    submissions_future = EXECUTOR.submit(submissions_por_tarea, course_id)
+
+    # La sub-cuenta se resuelve mientras las descargas grandes siguen en vuelo.
+    res["account"] = get_account(course_info.get("account_id"))
+
+    # 1) Alumnos: la llamada sin filtro de rol ya trae alumnos, profesores,
+    # tutores y directores; separamos por rol en Python en vez de pagar
+    # una llamada por cada filtro.
+    all_enrollments = enrollments_future.result() or []
     students = {}
-    for e in enrollments:
+    for e in all_enrollments:
+        if e.get("type") != "StudentEnrollment":
+            continue
         sid = e.get("user_id")
         uname = e.get("user", {}).get("name", f"User {sid}")
         students[sid] = uname
     if not students:
-        st.warning(f"No se encontraron estudiantes para el curso {course_id}.")
-        return None, [], {}
+        res["avisos"].append(f"No se encontraron estudiantes para el curso {course_id}.")
+        return res
 
-    # 2) Tareas
-    assignments = fetch_canvas_api(
-        f"/courses/{course_id}/assignments",
-        params={"per_page": 100}
-    )
+    # Info de enrollments (profesor, tutor, director): se derivan de la misma
+    # respuesta de enrollments que ya tenemos, sin mas llamadas HTTP.
+    # Profesores
+    teacher_data = [e for e in all_enrollments if e.get("role") == "TeacherEnrollment"]
+    teacher_names = []
+    teacher_emails = []
+    if teacher_data:
+        for t in teacher_data:
+            user = t.get("user", {})
+            teacher_names.append(user.get("name", "No existe"))
+            teacher_emails.append(user.get("login_id", "No existe"))
+    else:
+        teacher_names = ["No existe"]
+        teacher_emails = ["No existe"]
+
+    # Tutores
+    tutor_data = [e for e in all_enrollments if e.get("role") == "Tutor social"]
+    tutor_emails = []
+    if tutor_data:
+        for tu in tutor_data:
+            user = tu.get("user", {})
+            tutor_emails.append(user.get("login_id", "No existe"))
+    else:
+        tutor_emails = ["No existe"]
+
+    # Directores
+    director_data = [e for e in all_enrollments if e.get("role") == "Director"]
+    director_names = []
+    director_emails = []
+    if director_data:
+        for d in director_data:
+            user = d.get("user", {})
+            director_names.append(user.get("name", "No existe"))
+            director_emails.append(user.get("login_id", "No existe"))
+    else:
+        director_names = ["No existe"]
+        director_emails = ["No existe"]
+
+    # Crear string unificado si quieres mostrarlos como texto
+    info_curso = {
+        "Profesor": ", ".join(teacher_names),
+        "Correo Profesor": ", ".join(teacher_emails),
+        "Tutor": ", ".join(tutor_emails),
+        "Director": ", ".join(director_names),
+        "Correo Director": ", ".join(director_emails)
+    }
+    res["info"] = info_curso
+
+    # 2) Tareas: filtramos de entrada las que no tienen fecha. Si no queda
+    # ninguna, no hay nada que procesar y nos ahorramos todo lo de abajo.
+    assignments = assignments_future.result() or []
+
+    # Un solo st.warning con todas las tareas sin fecha, en vez de un
+    # componente por tarea.
+    sin_fecha = [
+        f"La tarea '{a.get('name')}' (ID: {a.get('id')}) no tiene fecha de entrega y se omitirá."
+        for a in assignments if not a.get("due_at")
+    ]
+    if sin_fecha:
+        res["avisos"].append("\n\n".join(sin_fecha))
+
+    assignments = [a for a in assignments if a.get("due_at")]
+    if not assignments:
+        return res
 
     processed_assignments = []
-    results = {sid: {} for sid in students}
+    # Construccion orientada a columnas: una lista por tarea en el orden de
+    # student_ids, que pandas consume directo sin unir claves fila por fila.
+    student_ids = list(students)
+    columnas = {}
+    columnas_kind = {}
 
     now_utc = datetime.now(timezone.utc)  # Momento actual en UTC
 
     asignaciones_info = []
     now_local_date = datetime.now(tz_local).date()
-    
-    for assignment in assignments:
-        asg_id = assignment.get("id")
-        asg_name = assignment.get("name")
-        due_at = assignment.get("due_at")
-        if not due_at:
-            st.warning(f"La tarea '{asg_name}' (ID: {asg_id}) no tiene fecha de entrega y se omitirá.")
-            continue
-        
-        # Convertimos la fecha a datetime en UTC
-        due_date_utc = datetime.fromisoformat(due_at.replace("Z", "+00:00"))
-        # Sigues usando +9 días según tu código
-        deadline_utc = due_date_utc + timedelta(days=9)
 
-        # Convertimos a hora local para mostrar al usuario:
-        due_date_local = due_date_utc.astimezone(tz_local)
-        deadline_local = deadline_utc.astimezone(tz_local)
+    # Submissions ya indexadas por (tarea, alumno) en el worker.
+    subs_by_asg = submissions_future.result()
+
+    # Fechas de entrega: un solo parseo vectorizado (y un solo strftime) para
+    # todas las tareas, en vez de fromisoformat + astimezone por cada una.
+    # Sigues usando +9 días según tu código.
+    due_utc_idx      = pd.to_datetime([a["due_at"] for a in assignments], utc=True)
+    deadline_utc_idx = due_utc_idx + pd.Timedelta(days=9)
+    deadline_local_idx = deadline_utc_idx.tz_convert(tz_local)
+    fechas_entrega = due_utc_idx.tz_convert(tz_local).strftime('%d/%m/%Y')
+    plazos_calif   = deadline_local_idx.strftime('%d/%m/%Y')
 
-        # Formato que se muestra en la interfaz
-        fecha_entrega_str = due_date_local.strftime('%d/%m/%Y')
-        plazo_calif_str   = deadline_local.strftime('%d/%m/%Y')
+    for assignment, due_date_utc, deadline_utc, deadline_local, fecha_entrega_str, plazo_calif_str in zip(
+            assignments, due_utc_idx, deadline_utc_idx, deadline_local_idx, fechas_entrega, plazos_calif):
+        asg_id = assignment.get("id")
+        asg_name = assignment.get("name")
 
         # Lógica en UTC para decidir el "estado_info"
         if due_date_utc > now_utc:
@@ -162,141 +400,149 @@ def procesar_curso(course_id: str) -> Tuple[pd.DataFrame, list, dict]:
 
         processed_assignments.append(assignment)
 
-        # Submissions
-        submissions = fetch_canvas_api(
-            f"/courses/{course_id}/assignments/{asg_id}/submissions",
-            params={"per_page": 100}
-        )
-        subs_map = {s.get("user_id"): s for s in submissions}
+        # Submissions de esta tarea (ya descargadas en la llamada bulk)
+        subs_map = subs_by_asg[asg_id]
+
+        # La fase de la tarea (estado_info) es la misma para todos los alumnos;
+        # la resolvemos una vez aqui en vez de comparar fechas por cada celda.
+        if estado_info == "No iniciado":
+            columnas[asg_name] = ["No iniciado"] * len(student_ids)
+            columnas_kind[asg_name] = ["future"] * len(student_ids)
+            continue
+        texto_sin_calificar = TEXTO_SIN_CALIFICAR[estado_info]
 
-        for sid in students:
+        col = []
+        col_kind = []
+        for sid in student_ids:
             submission = subs_map.get(sid)
-            delivered = es_entrega_real(submission)
             graded_at = submission.get("graded_at") if submission else None
 
-            # Comparación en UTC
-            if now_utc < due_date_utc:
-                text_celda = "No iniciado"
-            elif graded_at:
+            if graded_at:
                 # Si Canvas dice "graded" pero no hay score, mostramos "-"
                 score = submission.get("score")
                 if score is None:
-                    text_celda = "Calificada pero sin nota"
+                    text_celda, kind = "Calificada pero sin nota", "sin_nota"
                 elif submission.get("grade_matches_current_submission") is False:
-                    text_celda = "Nota no coincide"
+                    text_celda, kind = "Nota no coincide", "no_coincide"
                 else:
                     # Convertimos a entero sólo si score es un número válido
-                    text_celda = str(int(float(score)))
+                    text_celda, kind = str(int(float(score))), "graded"
             else:
-                # No calificado
-                if now_utc <= deadline_utc:
-                    if delivered:
-                        text_celda = "Entregado y en plazo"
-                    else:
-                        text_celda = "No entregado pero en plazo"
-                else:
-                    if delivered:
-                        text_celda = "No calificado en plazo"
-                    else:
-                        text_celda = "No entrego nada"
-
-            results[sid][asg_name] = text_celda
-            
-    if asignaciones_info:
-        df_asg = pd.DataFrame(asignaciones_info)
-        # Si quieres colorear la columna "Estado":
-        def color_estado_asg(v):
-            v = v.lower()
-            if v == "no iniciado":                return "background-color: black; color: white"
-            if v == "en plazo":                   return "background-color: lightgreen"
-            if v == "plazo vencido":             return "background-color: lightcoral"
-            return ""
-        styler = df_asg.style.map(color_estado_asg, subset=["Estado"])
-        st.dataframe(styler, use_container_width=False, hide_index=True)
-    else:
-        st.info("No hay tareas con fecha de entrega.")
-
-    df = pd.DataFrame.from_dict(
-        {students[sid]: data for sid, data in results.items()},
-        orient="index"
+                # No calificado: solo depende de si entrego o no
+                text_celda, kind = texto_sin_calificar[es_entrega_real(submission)]
+
+            col.append(text_celda)
+            col_kind.append(kind)
+
+        columnas[asg_name] = col
+        columnas_kind[asg_name] = col_kind
+
+
+    res["df_asg"] = pd.DataFrame(asignaciones_info)
+
+    # dtype category: el grid repite un punado de strings cortos, asi cada
+    # celda guarda un codigo entero en vez de su propio objeto str, y los
+    # isin/eq vectorizados de abajo operan sobre los codigos.
+    index_alumnos = [students[sid] for sid in student_ids]
+    res["df"] = pd.DataFrame(columnas, index=index_alumnos).astype("category")
+    res["df_kind"] = pd.DataFrame(columnas_kind, index=index_alumnos).astype("category")
+    res["asignaciones"] = processed_assignments
+
+    return res
+
+def render_curso(course_id: str, res: dict) -> dict:
+    """Dibuja en la UI un curso ya procesado y retorna su fila del resumen."""
+    if not res.get("course"):
+        st.error(f"Curso {course_id} no encontrado.")
+        return {
+            "Estado": "Inexistente",
+            "Errores": "No encontrado",
+            "Curso": "No encontrado",
+            "Nombre":"No encontrado",
+            "Diplomado":"No encontrado",
+            "Profesor": "No encontrado",
+            "Email Profesor":"No encontrado",
+            "Director": "No encontrado",
+            "Email Director": "No encontrado",
+            "Tutor": "No encontrado",
+        }
+
+    course_info = res["course"]
+    sub_account_info = res["account"]
+    info_curso = res["info"]
+    df = res["df"]
+    df_kind = res["df_kind"]
+
+    st.markdown(
+        f"##### [({course_info.get('id')}) {course_info.get('name')} / "
+        f"{course_info.get('course_code')}](https://canvas.uautonoma.cl/courses/{course_id}/gradebook)",
+        unsafe_allow_html=True
     )
-
-    # Info de enrollments (profesor, tutor, director)
-    # Profesores
-    teacher_data = fetch_canvas_api(
-        f"/courses/{course_id}/enrollments",
-        params={"role[]": "TeacherEnrollment", "per_page": 100}
+    st.markdown(
+        f"###### [({sub_account_info.get('id')}) {sub_account_info.get('name')}]"
+        f"(https://canvas.uautonoma.cl/accounts/{sub_account_info.get('id')})",
+        unsafe_allow_html=True
     )
-    teacher_names = []
-    teacher_emails = []
-    if teacher_data:
-        for t in teacher_data:
-            user = t.get("user", {})
-            teacher_names.append(user.get("name", "No existe"))
-            teacher_emails.append(user.get("login_id", "No existe"))
-    else:
-        teacher_names = ["No existe"]
-        teacher_emails = ["No existe"]
 
-    # Tutores
-    tutor_data = fetch_canvas_api(
-        f"/courses/{course_id}/enrollments",
-        params={"role[]": "Tutor social", "per_page": 100}
-    )
-    tutor_emails = []
-    if tutor_data:
-        for tu in tutor_data:
-            user = tu.get("user", {})
-            tutor_emails.append(user.get("login_id", "No existe"))
-    else:
-        tutor_emails = ["No existe"]
+    for aviso in res["avisos"]:
+        st.warning(aviso)
 
-    # Directores
-    director_data = fetch_canvas_api(
-        f"/courses/{course_id}/enrollments",
-        params={"role[]": "Director", "per_page": 100}
-    )
-    director_names = []
-    director_emails = []
-    if director_data:
-        for d in director_data:
-            user = d.get("user", {})
-            director_names.append(user.get("name", "No existe"))
-            director_emails.append(user.get("login_id", "No existe"))
+    if res["df_asg"] is not None:
+        styler_asg = res["df_asg"].style.apply(
+            lambda s: s.map(_ESTADO_ASG_COLOR).fillna(""), subset=["Estado"]
+        )
+        st.dataframe(styler_asg, use_container_width=False, hide_index=True)
+
+    if info_curso:
+        df_resumen_info = pd.DataFrame([{
+            "Profesor": info_curso["Profesor"],
+            "Email Profesor":   info_curso["Correo Profesor"],
+            "Director": info_curso["Director"],
+            "Email Director": info_curso["Correo Director"],
+            "Email Tutor":    info_curso["Tutor"],
+        }])
+        st.dataframe(df_resumen_info, use_container_width=True, hide_index=True)
+
+    celdas_malas = None
+    if df is not None and not df.empty:
+        # CSS precomputado a partir del tipo de celda: una sola aplicacion
+        # en vez de un callback por celda.
+        css = df_kind.map(lambda k: _STYLE_KIND.get(k, ""))
+        styler = df.style.apply(lambda _: css, axis=None)
+        st.dataframe(styler, use_container_width=True)
+
+        # Una sola pasada vectorizada marca las celdas fuera de plazo;
+        # la reutilizamos para el conteo y para el estado del curso.
+        celdas_malas = df.apply(lambda s: s.str.lower()).isin(ESTADOS_MALOS)
+        outside_plazo_count = int(celdas_malas.values.sum())
+
+        st.write(f"**Notas fuera de plazo:** {outside_plazo_count}")
     else:
-        director_names = ["No existe"]
-        director_emails = ["No existe"]
-
-    # Crear string unificado si quieres mostrarlos como texto
-    info_curso = {
-        "Profesor": ", ".join(teacher_names),
-        "Correo Profesor": ", ".join(teacher_emails),
-        "Tutor": ", ".join(tutor_emails),
-        "Director": ", ".join(director_names),
-        "Correo Director": ", ".join(director_emails)
+        st.info("No se procesaron asignaciones con fecha de entrega.")
+        outside_plazo_count = 0
+
+    # Resumen final (el color se deriva de _ESTADO_COLOR al estilizar)
+    if not res["asignaciones"]:
+        estado = "No configurado"
+    elif celdas_malas is not None and bool(celdas_malas.values.any()):
+        estado = "Hay cosas mal"
+    else:
+        estado = "Todo Bien"
+
+    # Agregamos el conteo 'outside_plazo_count' al resumen
+    return {
+        "Estado": estado,
+        "Errores": outside_plazo_count,
+        "Curso": course_id,
+        "Nombre": course_info.get("name"),
+        "Diplomado": sub_account_info.get("name"),
+        "Profesor": info_curso.get("Profesor"),
+        "Email Profesor": info_curso.get("Correo Profesor"),
+        "Director": info_curso.get("Director"),
+        "Email Director": info_curso.get("Correo Director"),
+        "Tutor": info_curso.get("Tutor"),
     }
 
-    return df, processed_assignments, info_curso
-
-def style_celda(val: str):
-    """Colores según el valor en la celda."""
-    v = val.strip().lower()
-    if v == "No iniciado":
-        return "background-color: black; color: white"
-    if v.isdigit():
-        return "background-color: lightgreen; color: black"
-    if v in ["entregado y en plazo", "no entregado pero en plazo"]:
-        return "background-color: lightblue; color: black"
-    if v == "no calificado en plazo":
-        return "background-color: yellow; color: black"
-    if v == "no entrego nada":
-        return "background-color: red; color: white"
-    if v == "nota no coincide":
-        return "background-color: orange; color: black"
-    if v == "calificada pero sin nota":
-        return "background-color: orange; color: black"
-    return ""
-
 st.title("Supervision de notas al dia 💯")
 st.success("Con esta herramientasa puedes revisar el estado de las calificaciones de tus cursos a supervisar en Canvas.")
 #st.info("Ultima correcion: Cambiado la forma de buscar al profesor de type[] a role[].")
@@ -308,111 +554,20 @@ raw_input = st.text_area(
 
 if st.button("Revisar!!", use_container_width=True):
     inicio_total = datetime.now()
-    course_ids = [c.strip() for c in re.split(r"[\s,]+", raw_input) if c.strip()]
+    # dict.fromkeys deduplica IDs pegados dos veces preservando el orden.
+    course_ids = list(dict.fromkeys(c.strip() for c in _CID_SPLIT.split(raw_input) if c.strip()))
     if not course_ids:
         st.error("Por favor, ingresa al menos un ID de curso.")
     else:
         resumen = []
-        for cid in course_ids:
+        # Cada curso se procesa en paralelo; el dibujo respeta el orden en que
+        # el usuario ingreso los IDs (cada curso aparece apenas su resultado
+        # esta listo y los anteriores ya se dibujaron).
+        futures = {cid: COURSE_EXECUTOR.submit(procesar_curso, cid) for cid in course_ids}
+        for cid, future in futures.items():
             st.divider()
-            # Info extra del curso (opcional)
-            course_info = fetch_canvas_api(f"/courses/{cid}")
-            if not course_info:
-                st.error(f"Curso {cid} no encontrado.")
-                resumen.append({
-                    "Estado": "Inexistente",
-                    "Errores": "No encontrado",
-                    "Curso": "No encontrado",
-                    "Nombre":"No encontrado",
-                    "Diplomado":"No encontrado",
-                    "Profesor": "No encontrado",
-                    "Email Profesor":"No encontrado",
-                    "Director": "No encontrado",
-                    "Email Director": "No encontrado",
-                    "Tutor": "No encontrado",
-                    "Color": "red"
-                })
-                continue
-            sub_account_info = fetch_canvas_api(f"/accounts/{course_info.get('account_id')}")
-
-            st.markdown(
-                f"##### [({course_info.get('id')}) {course_info.get('name')} / "
-                f"{course_info.get('course_code')}](https://canvas.uautonoma.cl/courses/{cid}/gradebook)",
-                unsafe_allow_html=True
-            )
-            st.markdown(
-                f"###### [({sub_account_info.get('id')}) {sub_account_info.get('name')}]"
-                f"(https://canvas.uautonoma.cl/accounts/{sub_account_info.get('id')})",
-                unsafe_allow_html=True
-            )
             try:
-                df, asg_ok, info_curso = procesar_curso(cid)
-                
-                # Info del curso
-                # st.markdown(
-                #     f"**Profesor:** {info_curso.get('Profesor')} | "
-                #     f"**Correo:** {info_curso.get('Correo Profesor')}<br>"
-                #     f"**Tutor:** {info_curso.get('Tutor')} | "
-                #     f"**Director:** {info_curso.get('Director')}",
-                #     unsafe_allow_html=True
-                # )
-                lista_info = []
-                lista_info.append({
-                    "Profesor": info_curso["Profesor"],
-                    "Email Profesor":   info_curso["Correo Profesor"],
-                    "Director": info_curso["Director"],
-                    "Email Director": info_curso["Correo Director"],
-                    "Email Tutor":    info_curso["Tutor"],
-                })
-                df_resumen_info = pd.DataFrame(lista_info)
-                st.dataframe(df_resumen_info, use_container_width=True, hide_index=True)
-                
-                if df is not None and not df.empty:
-                    styler = df.style.map(style_celda)
-                    #st.write(styler.to_html(), unsafe_allow_html=True)
-                    st.dataframe(styler, use_container_width=True)
-
-                    # Contar cuántos alumnos están fuera de plazo
-                    outside_plazo_count = 0
-                    for val in df.values.flatten():
-                        if val.lower() in ["no calificado en plazo", "no entrego nada", "nota no coincide", "calificada pero sin nota"]:
-                            outside_plazo_count += 1
-
-                    st.write(f"**Notas fuera de plazo:** {outside_plazo_count}")
-
-                else:
-                    st.info("No se procesaron asignaciones con fecha de entrega.")
-                    outside_plazo_count = 0
-
-                # Resumen final
-                if not asg_ok:
-                    estado = "No configurado"
-                    color_estado = "orange"
-                else:
-                    all_values = df.values.flatten().tolist()
-                    #print(all_values)
-                    if any(str(v).strip().lower() in ["no calificado en plazo", "no entrego nada", "nota no coincide", "calificada pero sin nota"] for v in all_values):
-                        estado = "Hay cosas mal"
-                        color_estado = "red"
-                    else:
-                        estado = "Todo Bien"
-                        color_estado = "lightgreen"
-
-                # Agregamos el conteo 'outside_plazo_count' al resumen
-                resumen.append({
-                    "Estado": estado,
-                    "Errores": outside_plazo_count,
-                    "Curso": cid,
-                    "Nombre":course_info.get("name"),
-                    "Diplomado":sub_account_info.get("name"),
-                    "Profesor": info_curso.get("Profesor"),
-                    "Email Profesor": info_curso.get("Correo Profesor"),
-                    "Director": info_curso.get("Director"),
-                    "Email Director": info_curso.get("Correo Director"),
-                    "Tutor": info_curso.get("Tutor"),
-                    "Color": color_estado
-                })
-
+                resumen.append(render_curso(cid, future.result()))
             except Exception as e:
                 st.error(f"Error procesando curso {cid}: {e}")
 
@@ -421,16 +576,13 @@ if st.button("Revisar!!", use_container_width=True):
 
         if resumen:
             st.markdown("## Resumen de cursos")
-            df_resumen = pd.DataFrame(resumen).drop(columns=["Color"], errors="ignore")
+            df_resumen = pd.DataFrame(resumen)
 
             def style_resumen_cell(val):
-                row = next((r for r in resumen if r["Estado"] == val), None)
-                if row:
-                    return f"background-color: {row['Color']};"
-                return ""
+                color = _ESTADO_COLOR.get(val)
+                return f"background-color: {color};" if color else ""
 
             styler_resumen = df_resumen.style.map(style_resumen_cell, subset=["Estado"])
-            #st.write(styler_resumen.to_html(escape=False), unsafe_allow_html=True)
             st.dataframe(styler_resumen, use_container_width=True, hide_index=False)
 
         st.markdown(f"**Tiempo total del proceso:** {tiempo_total:.2f} segundos")